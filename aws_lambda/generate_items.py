@@ -6,6 +6,9 @@ import utils
 
 params_fp = "/opt/generator_params.json"
 
+# Time (ms) left for the Lambda when the job stops and waits to be resumed.
+min_time_left = 30000
+
 
 def items_dset(
     params: Namespace, size: int = 1000, dt: str = None
@@ -42,6 +45,57 @@ def items_dset(
     return 200, f"{size} items generated."
 
 
+def items_job(
+    params: Namespace,
+    job_id: str,
+    size: int,
+    chunk_size: int,
+    context,
+    dt: str = None,
+):
+    def generate_chunk(n, state):
+        return data.generate_items(params, n), state
+
+    def finalize(checkpoint):
+        base_lst_path = utils.latest_path(
+            "items", "_available", checkpoint["dt"]
+        )
+        if base_lst_path:
+            available = utils.load_data_s3(base_lst_path + "_available.json")
+        else:
+            available = []
+        for chunk in checkpoint["chunks"]:
+            items = utils.load_data_s3(chunk["path"])
+            available.extend(item["id"] for item in items)
+        utils.save_data_s3(
+            available, checkpoint["base_path"] + "_available.json"
+        )
+
+    def should_stop():
+        return context.get_remaining_time_in_millis() < min_time_left
+
+    try:
+        checkpoint = utils.run_job(
+            job_id,
+            "items",
+            generate_chunk,
+            size,
+            chunk_size,
+            dt=dt,
+            finalize=finalize,
+            should_stop=should_stop,
+        )
+    except (AttributeError, ValueError):
+        return 400, "Some parameters are incorrect or missing."
+    except:  # NOQA: E722 (do not use bare 'except')
+        return 500, "Job failed. Rerun it to resume from the last checkpoint."
+
+    n_records = checkpoint["n_records"]
+    if not checkpoint["done"]:
+        return 202, f"{n_records} items generated. Rerun to resume."
+    return 200, f"{n_records} items generated."
+
+
 def lambda_handler(event, context):
     if not event["body"]:
         status_code, msg = 400, "Parameters not provided."
@@ -53,5 +107,12 @@ def lambda_handler(event, context):
             params = Namespace(**body["params"])
         else:
             params = Namespace(**utils.load_data(filepath=params_fp))
-        status_code, msg = items_dset(params, size, dt)
+        job_id = body.get("job_id", None)
+        if job_id:
+            chunk_size = body.get("chunk_size", 1000)
+            status_code, msg = items_job(
+                params, job_id, size, chunk_size, context, dt
+            )
+        else:
+            status_code, msg = items_dset(params, size, dt)
     return {"statusCode": status_code, "body": json.dumps(msg)}
@@ -10,6 +10,9 @@ params_fp = "/opt/generator_params.json"
 
 lambda_client = boto3.client("lambda")
 
+# Time (ms) left for the Lambda when the job stops and waits to be resumed.
+min_time_left = 30000
+
 
 def user_actions_dset(params: Namespace, size: int = 1000):
     try:
@@ -45,6 +48,61 @@ def user_actions_dset(params: Namespace, size: int = 1000):
     return 200, f"{len(user_actions)} user actions generated."
 
 
+def user_actions_job(
+    params: Namespace, job_id: str, size: int, chunk_size: int, context
+):
+    try:
+        checkpoint = utils.load_checkpoint(job_id)
+        if checkpoint:
+            meta = checkpoint["meta"]
+        else:
+            base_items_path = utils.latest_path(
+                dset_prefix="items", dset_type="_available"
+            )
+            meta = {
+                "user_ids_path": utils.latest_path("user_ids") + ".json",
+                "items_path": base_items_path + "_available.json",
+                "start_date": params.start_date,
+                "end_date": params.end_date,
+            }
+        user_ids = utils.load_data_s3(path=meta["user_ids_path"])
+        items_ids = utils.load_data_s3(path=meta["items_path"])
+    except:  # NOQA: E722 (do not use bare 'except')
+        return 500, "Cannot load the job inputs from S3."
+
+    params.start_date = meta["start_date"]
+    params.end_date = meta["end_date"]
+
+    def generate_chunk(n, state):
+        user_actions, flow = data.generate_user_actions_chunk(
+            params, user_ids, items_ids, n, state.get("flow")
+        )
+        return user_actions, {"flow": flow} if flow else {}
+
+    def should_stop():
+        return context.get_remaining_time_in_millis() < min_time_left
+
+    try:
+        checkpoint = utils.run_job(
+            job_id,
+            "user_actions",
+            generate_chunk,
+            size,
+            chunk_size,
+            meta=meta,
+            should_stop=should_stop,
+        )
+    except (AttributeError, ValueError):
+        return 400, "Some parameters are incorrect or missing."
+    except:  # NOQA: E722 (do not use bare 'except')
+        return 500, "Job failed. Rerun it to resume from the last checkpoint."
+
+    n_records = checkpoint["n_records"]
+    if not checkpoint["done"]:
+        return 202, f"{n_records} user actions generated. Rerun to resume."
+    return 200, f"{n_records} user actions generated."
+
+
 def lambda_handler(event, context):
     if not event["body"]:
         status_code, msg = 400, "Parameters not provided."
@@ -66,5 +124,12 @@ def lambda_handler(event, context):
         params.start_date = start_date
         params.end_date = end_date
 
-        status_code, msg = user_actions_dset(params, size)
+        job_id = body.get("job_id", None)
+        if job_id:
+            chunk_size = body.get("chunk_size", 1000)
+            status_code, msg = user_actions_job(
+                params, job_id, size, chunk_size, context
+            )
+        else:
+            status_code, msg = user_actions_dset(params, size)
     return {"statusCode": status_code, "body": json.dumps(msg)}
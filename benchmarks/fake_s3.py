@@ -0,0 +1,140 @@
+# benchmarks/fake_s3.py
+# In-process stand-in for the S3 resource used by `utils`.
+
+import io
+import itertools
+import threading
+import time
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+
+class FakeS3:
+    def __init__(self, latency_ms: float = 0.0):
+        """
+        Args:
+            latency_ms (float): Delay added to every request to imitate a round trip to S3. (Default is 0.0)
+        """
+        self.latency_ms = latency_ms
+        self.objects = {}
+        self.etags = {}
+        self.versions = itertools.count()
+        self.log = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def seed(self, data_dir: Path) -> int:
+        """Add all JSON files from the directory as objects.
+
+        Files are read lazily, on the first request to the object.
+
+        Args:
+            data_dir (Path): Directory with the data sets (e.g. `data/`).
+
+        Returns:
+            The number of added objects.
+        """
+        paths = sorted(Path(data_dir).rglob("*.json"))
+        with self.lock:
+            for path in paths:
+                key = path.relative_to(data_dir).as_posix()
+                self.objects[key] = path
+                self.etags[key] = f'"{next(self.versions)}"'
+        return len(paths)
+
+    def record(self, op: str, key: str) -> None:
+        """Save the request to the log and wait for the imitated latency.
+
+        Args:
+            op (str): Request type ("list", "get", "put", "head" or "delete").
+            key (str): Key (or prefix) of the request.
+        """
+        invocation = getattr(self.local, "invocation", None)
+        with self.lock:
+            self.log.append((invocation, op, key, time.perf_counter()))
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def Bucket(self, name: str) -> "FakeBucket":
+        return FakeBucket(self)
+
+    def Object(self, bucket_name: str, key: str) -> "FakeObject":
+        return FakeObject(self, key)
+
+
+class FakeBucket:
+    def __init__(self, store: FakeS3):
+        self.store = store
+        self.objects = FakeObjects(store)
+
+    def delete_objects(self, Delete: dict) -> dict:
+        for obj in Delete["Objects"]:
+            FakeObject(self.store, obj["Key"]).delete()
+        return {}
+
+
+class FakeObjects:
+    def __init__(self, store: FakeS3):
+        self.store = store
+
+    def filter(self, Prefix: str = "") -> list:
+        self.store.record("list", Prefix)
+        with self.store.lock:
+            keys = sorted(
+                k for k in self.store.objects if k.startswith(Prefix)
+            )
+        return [FakeObject(self.store, key) for key in keys]
+
+
+class FakeObject:
+    def __init__(self, store: FakeS3, key: str):
+        self.store = store
+        self.key = key
+
+    @property
+    def e_tag(self) -> str:
+        with self.store.lock:
+            return self.store.etags.get(self.key)
+
+    def body(self) -> bytes:
+        with self.store.lock:
+            body = self.store.objects.get(self.key)
+        if body is None:
+            error = {"Error": {"Code": "NoSuchKey", "Message": self.key}}
+            raise ClientError(error, "GetObject")
+        if isinstance(body, Path):
+            body = body.read_bytes()
+            with self.store.lock:
+                self.store.objects[self.key] = body
+        return body
+
+    def load(self) -> None:
+        self.store.record("head", self.key)
+        with self.store.lock:
+            exists = self.key in self.store.objects
+        if not exists:
+            error = {"Error": {"Code": "404", "Message": "Not Found"}}
+            raise ClientError(error, "HeadObject")
+
+    def get(self, Range: str = None) -> dict:
+        self.store.record("get", self.key)
+        body = self.body()
+        if Range:
+            start, end = Range[len("bytes=") :].split("-")
+            body = body[int(start) : int(end) + 1]
+        return {"Body": io.BytesIO(body), "ETag": self.e_tag}
+
+    def put(self, Body: bytes, ContentType: str = None) -> dict:
+        self.store.record("put", self.key)
+        with self.store.lock:
+            self.store.objects[self.key] = Body
+            self.store.etags[self.key] = f'"{next(self.store.versions)}"'
+        return {}
+
+    def delete(self) -> dict:
+        self.store.record("delete", self.key)
+        with self.store.lock:
+            self.store.objects.pop(self.key, None)
+            self.store.etags.pop(self.key, None)
+        return {}
@@ -0,0 +1,397 @@
+# benchmarks/lambda_load.py
+# Local concurrent load harness for the Lambda handlers.
+
+import importlib
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import typer
+
+from benchmarks.fake_s3 import FakeS3
+from config import config
+
+HANDLERS = [
+    "generate_items",
+    "delete_items",
+    "generate_user_actions",
+    "generate_user_ids",
+]
+
+invocation_ids = itertools.count()
+
+app = typer.Typer()
+
+
+class LambdaContext:
+    def __init__(self, timeout_ms: int = 900000):
+        """
+        Args:
+            timeout_ms (int): Timeout of the Lambda function. (Default is 900000)
+        """
+        self.deadline = time.perf_counter() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int((self.deadline - time.perf_counter()) * 1000)
+
+
+def load_handlers(store: FakeS3, names: list) -> dict:
+    """Import the Lambda handlers the same way they are deployed.
+
+    `data` and `utils` are imported as top-level modules (like from the
+    Lambda layer) and S3 in `utils` is replaced with the stand-in.
+
+    Args:
+        store (FakeS3): S3 stand-in.
+        names (list): Names of the handler modules in `aws_lambda/`.
+
+    Returns:
+        The dictionary with handler modules by name.
+    """
+    os.environ.setdefault("BUCKET", "local")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    for directory in (config.GENERATOR_DIR, config.LAMBDA_DIR):
+        if str(directory) not in sys.path:
+            sys.path.insert(0, str(directory))
+
+    utils = importlib.import_module("utils")
+    utils.s3 = store
+
+    modules = {}
+    for name in names:
+        module = importlib.import_module(name)
+        if hasattr(module, "params_fp"):
+            module.params_fp = str(
+                Path(config.CONFIG_DIR, "generator_params.json")
+            )
+        modules[name] = module
+    return modules
+
+
+def vary_params(params: dict, rng: random.Random) -> dict:
+    """Randomly change the generator parameters.
+
+    Args:
+        params (dict): Default generator parameters.
+        rng (random.Random): Random number generator.
+
+    Returns:
+        The changed copy of the parameters.
+    """
+    params = dict(params)
+    params["pfi"] = round(rng.uniform(0.0, 0.2), 2)
+    params["price_upper"] = rng.choice([20.0, 50.0, 100.0])
+    return params
+
+
+def make_event(
+    name: str,
+    rng: random.Random,
+    params: dict,
+    sizes: list,
+    start: datetime,
+    hours: int,
+    p_now: float,
+) -> dict:
+    """Create an API Gateway event for the handler.
+
+    Args:
+        name (str): Name of the handler module.
+        rng (random.Random): Random number generator.
+        params (dict): Default generator parameters.
+        sizes (list): Possible sizes of generated data sets.
+        start (datetime): Start of the range of `dt`.
+        hours (int): Length of the range of `dt` in hours.
+        p_now (float): Probability that `dt` is not set (current time is used).
+
+    Returns:
+        The event.
+    """
+    if rng.random() < p_now:
+        dt = None
+    else:
+        dt = start + timedelta(seconds=rng.randrange(hours * 3600))
+        dt = dt.isoformat()
+
+    if name == "generate_items":
+        body = {
+            "size": rng.choice(sizes),
+            "dt": dt,
+            "params": vary_params(params, rng),
+        }
+    elif name == "delete_items":
+        body = {"n_del": rng.randint(1, 10), "dt": dt}
+    elif name == "generate_user_actions":
+        end_date = datetime.fromisoformat(dt) if dt else datetime.now()
+        body = {
+            "size": rng.choice(sizes),
+            "params": vary_params(params, rng),
+            "start_date": (end_date - timedelta(hours=1)).isoformat(),
+            "end_date": end_date.isoformat(),
+        }
+    else:
+        body = {"size": rng.choice(sizes)}
+    return {"body": json.dumps(body)}
+
+
+def run_load(
+    store: FakeS3,
+    modules: dict,
+    events: list,
+    concurrency: int = 8,
+    trace_memory: bool = False,
+) -> dict:
+    """Invoke the handlers concurrently.
+
+    Tracing memory slows down the handlers, so latencies of a traced run
+    are not representative. Measure memory in a separate run.
+
+    Args:
+        store (FakeS3): S3 stand-in used by the handlers.
+        modules (dict): Handler modules by name.
+        events (list): Pairs of handler name and event, in order of submission.
+        concurrency (int): The number of concurrent invocations. (Default is 8)
+        trace_memory (bool): Trace the peak memory of the run with `tracemalloc`. (Default is False)
+
+    Returns:
+        The dictionary with invocations, wall time and peak memory of the run.
+    """
+
+    def invoke(name, event):
+        invocation_id = next(invocation_ids)
+        store.local.invocation = invocation_id
+        start = time.perf_counter()
+        try:
+            response = modules[name].lambda_handler(event, LambdaContext())
+            status = response["statusCode"]
+        except Exception as e:
+            status = type(e).__name__
+        end = time.perf_counter()
+        store.local.invocation = None
+        return {
+            "id": invocation_id,
+            "handler": name,
+            "status": status,
+            "start": start,
+            "end": end,
+        }
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(invoke, *e) for e in events]
+        invocations = [f.result() for f in futures]
+    wall = time.perf_counter() - start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "invocations": invocations,
+        "wall": wall,
+        "peak_memory": peak_memory,
+        "traced": trace_memory,
+    }
+
+
+def summarize(run: dict) -> dict:
+    """Compute latency percentiles and throughput per handler.
+
+    Args:
+        run (dict): The result of `run_load`.
+
+    Returns:
+        The dictionary with statistics by handler name.
+    """
+    by_handler = defaultdict(list)
+    for inv in run["invocations"]:
+        by_handler[inv["handler"]].append(inv)
+
+    stats = {}
+    for name, invocations in by_handler.items():
+        latencies = [(i["end"] - i["start"]) * 1000 for i in invocations]
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        stats[name] = {
+            "n": len(invocations),
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+            "throughput_rps": round(len(invocations) / run["wall"], 2),
+            "statuses": dict(Counter(str(i["status"]) for i in invocations)),
+        }
+    return stats
+
+
+def find_contention(store: FakeS3, run: dict) -> dict:
+    """Find the effects of overlapping invocations in the S3 request log.
+
+    - overwrites: the same key was written by several invocations.
+    - stale_reads: an invocation derived its `_available` list from an
+      older list than the latest one before its `dt`, because an
+      overlapping invocation wrote the newer list concurrently.
+
+    Args:
+        store (FakeS3): S3 stand-in used by the handlers.
+        run (dict): The result of `run_load`.
+
+    Returns:
+        The dictionary with overwrites and stale reads.
+    """
+    invocations = {inv["id"]: inv for inv in run["invocations"]}
+
+    writers = defaultdict(set)
+    available_reads = defaultdict(list)
+    available_writes = defaultdict(list)
+    for invocation_id, op, key, _ in store.log:
+        if invocation_id not in invocations:
+            continue
+        if op == "put":
+            writers[key].add(invocation_id)
+            if key.endswith("_available.json"):
+                available_writes[invocation_id].append(key)
+        elif op == "get" and key.endswith("_available.json"):
+            available_reads[invocation_id].append(key)
+
+    overwrites = {
+        key: [invocations[i]["handler"] for i in sorted(ids)]
+        for key, ids in writers.items()
+        if len(ids) > 1
+    }
+
+    def overlap(a, b):
+        return a["start"] < b["end"] and b["start"] < a["end"]
+
+    stale_reads = []
+    for invocation_id, written in available_writes.items():
+        inv = invocations[invocation_id]
+        reads = available_reads[invocation_id]
+        read = max(reads) if reads else ""
+        for key in written:
+            for other_key, other_ids in writers.items():
+                if not other_key.endswith("_available.json"):
+                    continue
+                if not read < other_key < key:
+                    continue
+                for other_id in other_ids - {invocation_id}:
+                    if overlap(inv, invocations[other_id]):
+                        stale_reads.append(
+                            {
+                                "handler": inv["handler"],
+                                "written": key,
+                                "read": read or None,
+                                "missed": other_key,
+                                "missed_by": invocations[other_id]["handler"],
+                            }
+                        )
+
+    return {"overwrites": overwrites, "stale_reads": stale_reads}
+
+
+def report(
+    title: str, run: dict, contention: dict, peak_memory: int = None
+) -> None:
+    mode = "traced" if run["traced"] else "untraced"
+    typer.echo(
+        f"\n{title} ({len(run['invocations'])} invocations, "
+        f"{run['wall']:.2f} s, latency from {mode} run)"
+    )
+    if peak_memory is not None:
+        typer.echo(
+            f"  peak traced memory (separate run): {peak_memory / 2**20:.1f} MiB"
+        )
+    for name, s in summarize(run).items():
+        typer.echo(
+            f"  {name:<22} n={s['n']:<4} p50={s['p50_ms']:>8} ms "
+            f"p95={s['p95_ms']:>8} ms p99={s['p99_ms']:>8} ms "
+            f"{s['throughput_rps']:>7} req/s {s['statuses']}"
+        )
+    typer.echo(
+        f"  contention: {len(contention['overwrites'])} overwritten keys, "
+        f"{len(contention['stale_reads'])} stale _available reads"
+    )
+    for stale in contention["stale_reads"][:5]:
+        typer.echo(
+            f"    {stale['handler']} wrote {stale['written']} from "
+            f"{stale['read']}, missed {stale['missed']} ({stale['missed_by']})"
+        )
+
+
+@app.command()
+def run(
+    handlers: str = ",".join(HANDLERS),
+    n_events: int = 50,
+    concurrency: int = 8,
+    sizes: str = "10,100,1000",
+    start: str = "2022-02-06T14:00:00",
+    hours: int = 24,
+    p_now: float = 0.1,
+    latency_ms: float = 10.0,
+    seed: int = 42,
+    mixed: bool = True,
+    trace_memory: bool = True,
+    output: Path = None,
+):
+    """Run each handler under concurrent load, then all of them together.
+
+    Latency and throughput come from an untraced run. With `--trace-memory`,
+    the same events are replayed with `tracemalloc` to measure peak memory.
+    """
+    names = handlers.split(",")
+    sizes = [int(size) for size in sizes.split(",")]
+    start = datetime.fromisoformat(start)
+    rng = random.Random(seed)
+    with open(Path(config.CONFIG_DIR, "generator_params.json")) as fp:
+        params = json.load(fp)
+
+    store = FakeS3(latency_ms)
+    n_objects = store.seed(config.DATA_DIR)
+    typer.echo(f"Seeded S3 stand-in with {n_objects} objects.")
+    modules = load_handlers(store, names)
+
+    def events_for(name):
+        return [
+            (name, make_event(name, rng, params, sizes, start, hours, p_now))
+            for _ in range(n_events)
+        ]
+
+    phases = [(name, events_for(name)) for name in names]
+    if mixed:
+        events = [e for name in names for e in events_for(name)]
+        rng.shuffle(events)
+        phases.append(("mixed", events))
+
+    results = {}
+    for title, events in phases:
+        result = run_load(store, modules, events, concurrency)
+        contention = find_contention(store, result)
+        peak_memory = None
+        if trace_memory:
+            memory_run = run_load(store, modules, events, concurrency, True)
+            peak_memory = memory_run["peak_memory"]
+        report(title, result, contention, peak_memory)
+        results[title] = {
+            "wall_s": result["wall"],
+            "latency_traced": result["traced"],
+            "peak_memory": peak_memory,
+            "handlers": summarize(result),
+            "contention": contention,
+        }
+
+    if output:
+        with open(output, "w") as fp:
+            json.dump(results, fp, indent=2)
+
+
+if __name__ == "__main__":
+    app()
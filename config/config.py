@@ -6,3 +6,6 @@ from pathlib import Path
 # Directories
 BASE_DIR = Path(__file__).parent.parent.absolute()
 CONFIG_DIR = Path(BASE_DIR, "config")
+DATA_DIR = Path(BASE_DIR, "data")
+GENERATOR_DIR = Path(BASE_DIR, "generator")
+LAMBDA_DIR = Path(BASE_DIR, "aws_lambda")
@@ -0,0 +1,193 @@
+# generator/backfill.py
+# Functions for backfilling data sets over a date range.
+
+import secrets
+import time
+import zlib
+from argparse import Namespace
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Callable
+
+from generator import update, utils
+
+
+def schedule(
+    start: str,
+    end: str,
+    cadence: int = 60,
+    items: bool = True,
+    user_actions: bool = True,
+    user_ids: bool = False,
+) -> list:
+    """Create tasks for every time step in the range and their dependencies.
+
+    Each item task depends on the item task of the previous step, because
+    available items are derived from the previous list. A user actions task
+    depends only on the tasks of its own step, so steps run in parallel.
+
+    Args:
+        start (str): Start of the range (ISO format).
+        end (str): End of the range, not included (ISO format).
+        cadence (int): Minutes between time steps. (Default is 60)
+        items (bool): Generate items. (Default is True)
+        user_actions (bool): Generate user actions. (Default is True)
+        user_ids (bool): Generate user ids. (Default is False)
+
+    Returns:
+        The list of tasks in order of time steps.
+        A task is a dictionary with `id`, `kind`, `dt` and `deps` (ids of tasks).
+
+    Raises:
+        ValueError: If `cadence` is less than 1.
+    """
+    if cadence < 1:
+        raise ValueError("cadence must be at least 1 minute.")
+
+    start = datetime.fromisoformat(start)
+    end = datetime.fromisoformat(end)
+    step = timedelta(minutes=cadence)
+
+    tasks = []
+    prev_items_id = None
+    dt = start
+    while dt < end:
+        dt_str = dt.isoformat()
+        deps = []
+        if user_ids:
+            task = {"id": f"user_ids/{dt_str}", "kind": "user_ids"}
+            tasks.append({**task, "dt": dt_str, "deps": []})
+            deps.append(task["id"])
+        if items:
+            task = {"id": f"items/{dt_str}", "kind": "items"}
+            prev_deps = [prev_items_id] if prev_items_id else []
+            tasks.append({**task, "dt": dt_str, "deps": prev_deps})
+            prev_items_id = task["id"]
+            deps.append(task["id"])
+        if user_actions:
+            task = {"id": f"user_actions/{dt_str}", "kind": "user_actions"}
+            tasks.append({**task, "dt": dt_str, "deps": deps})
+        dt += step
+    return tasks
+
+
+def run_task(
+    task: dict,
+    params: Namespace,
+    sizes: dict,
+    cadence: int = 60,
+    n_del: int = 5,
+    seed: int = None,
+) -> int:
+    """Generate the data set of the task.
+
+    User actions of a time step cover the previous `cadence` minutes and use
+    items and user ids of the same step if they are generated by the backfill.
+
+    Args:
+        task (dict): The task from `schedule`.
+        params (Namespace): Input parameters for operations.
+        sizes (dict): The number of records by kind of the task.
+        cadence (int): Minutes between time steps. (Default is 60)
+        n_del (int): The number of items to delete in each step. (Default is 5)
+        seed (int, optional): The seed. Each task uses a seed derived from
+            it and the id of the task. If not set, a random seed is taken
+            from the OS, because forked workers share the state of Faker
+            and NumPy generators.
+
+    Returns:
+        The number of generated records.
+    """
+    kind, dt, size = task["kind"], task["dt"], sizes[task["kind"]]
+    if seed is None:
+        seed = secrets.randbits(32)
+    utils.set_seed(zlib.crc32(f"{seed}/{task['id']}".encode()))
+
+    if kind == "user_ids":
+        update.user_ids_dset(size, dt)
+        return size
+    if kind == "items":
+        update.items_dset(params, size, n_del, dt)
+        return size
+
+    user_ids_path = items_path = None
+    for dep in task["deps"]:
+        if dep.startswith("user_ids/"):
+            user_ids_path = utils.dt_path("user_ids", dt) + ".json"
+        elif dep.startswith("items/"):
+            items_path = utils.dt_path("items", dt) + "_available.json"
+    end_date = datetime.fromisoformat(dt)
+    start_date = end_date - timedelta(minutes=cadence)
+    params = Namespace(**vars(params))
+    params.start_date = start_date.isoformat()
+    params.end_date = end_date.isoformat()
+    return update.user_actions_dset(
+        params, size, dt, user_ids_path, items_path
+    )
+
+
+def run(
+    tasks: list,
+    params: Namespace,
+    sizes: dict,
+    cadence: int = 60,
+    n_del: int = 5,
+    seed: int = None,
+    workers: int = None,
+    on_progress: Callable = None,
+) -> dict:
+    """Run the tasks in parallel processes, respecting their dependencies.
+
+    Args:
+        tasks (list): Tasks from `schedule`.
+        params (Namespace): Input parameters for operations.
+        sizes (dict): The number of records by kind of the task.
+        cadence (int): Minutes between time steps. (Default is 60)
+        n_del (int): The number of items to delete in each step. (Default is 5)
+        seed (int, optional): The seed (see `run_task`).
+        workers (int, optional): The number of processes. (Default is the number of CPUs)
+        on_progress (Callable, optional): Function called with the finished
+            task and the statistics so far.
+
+    Returns:
+        The dictionary with the number of tasks and records and the elapsed time (s).
+    """
+    pending = {task["id"]: task for task in tasks}
+    finished = set()
+    running = {}
+    stats = {"n_tasks": 0, "n_records": 0, "elapsed": 0.0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            ready = [
+                task
+                for task in pending.values()
+                if all(dep in finished for dep in task["deps"])
+            ]
+            for task in ready:
+                del pending[task["id"]]
+                future = executor.submit(
+                    run_task, task, params, sizes, cadence, n_del, seed
+                )
+                running[future] = task
+            if not running:
+                raise ValueError("Some tasks have unknown dependencies.")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                try:
+                    n_records = future.result()
+                except Exception:
+                    for f in running:
+                        f.cancel()
+                    raise
+                finished.add(task["id"])
+                stats["n_tasks"] += 1
+                stats["n_records"] += n_records
+                stats["elapsed"] = time.perf_counter() - start
+                if on_progress:
+                    on_progress(task, stats)
+
+    return stats
@@ -0,0 +1,141 @@
+# generator/compact.py
+# Functions for compacting hourly files into daily partitions.
+
+import datetime
+import json
+import re
+from pathlib import Path
+
+from generator import utils
+
+
+def hourly_files(dset_prefix: str) -> dict:
+    """Find hourly files of the data set on S3, grouped by day and type.
+
+    Args:
+        dset_prefix (str): A prefix of the path to the data set.
+
+    Returns:
+        The dictionary `{day: {dset_type: [(path, timestamp), ...]}}`.
+    """
+    pattern = re.compile(
+        rf"{dset_prefix}/(\d{{4}}/\d{{2}}/\d{{2}})/\d{{2}}/(\d{{14}})(.*)\.json"
+    )
+    files = {}
+    bucket = utils.s3.Bucket(utils.bucket_name)
+    for obj in bucket.objects.filter(Prefix=dset_prefix + "/"):
+        r = pattern.fullmatch(obj.key)
+        if r:
+            day, timestamp, dset_type = r.groups()
+            day_files = files.setdefault(day, {})
+            day_files.setdefault(dset_type, []).append((obj.key, timestamp))
+    return files
+
+
+def partition_path(dset_prefix: str, day: str, dset_type: str) -> str:
+    """Create path for the partition of the day.
+
+    Args:
+        dset_prefix (str): A prefix of the path to the data set.
+        day (str): The day. (e.g "2022/02/05")
+        dset_type (str): Data set file type. (e.g "", "_available")
+
+    Returns:
+        The path to the partition.
+        prefix/year/month/day/yearmonthday_type.jsonl
+    """
+    name = day.replace("/", "") + dset_type + ".jsonl"
+    return str(Path(dset_prefix, day, name))
+
+
+def compact_day(dset_prefix: str, day: str, files: dict) -> int:
+    """Merge hourly files of the day into one partition per data set type.
+
+    Every original file becomes one line of the partition (JSON Lines).
+    Files compacted by earlier runs stay in the partitions, so the day can be
+    compacted again when new hourly files appear. Partitions are saved first, then the
+    index, and only then the original files are deleted, so an interrupted
+    run is completed by the next one.
+
+    Args:
+        dset_prefix (str): A prefix of the path to the data set.
+        day (str): The day. (e.g "2022/02/05")
+        files (dict): Hourly files of the day by type (see `hourly_files`).
+
+    Returns:
+        The number of compacted files.
+    """
+    path = utils.index_path(dset_prefix, day)
+    if utils.exists_s3(path):
+        index = utils.load_index(dset_prefix, day, refresh=True)
+    else:
+        index = {"dset_prefix": dset_prefix, "day": day, "entries": {}}
+    entries = index["entries"]
+
+    for dset_type, type_files in files.items():
+        partition = partition_path(dset_prefix, day, dset_type)
+        size = max(
+            (
+                e["offset"] + e["length"] + 1
+                for e in entries.values()
+                if e["partition"] == partition
+            ),
+            default=0,
+        )
+        body = b""
+        if size:
+            obj = utils.s3.Object(utils.bucket_name, partition)
+            body = obj.get(Range=f"bytes=0-{size - 1}")["Body"].read()
+
+        for key, timestamp in sorted(type_files, key=lambda f: f[1]):
+            line = json.dumps(utils.load_data_s3(key)).encode("UTF-8")
+            entry = entries.get(key)
+            if entry and entry["partition"] == partition:
+                start = entry["offset"]
+                if body[start : start + entry["length"]] == line:
+                    continue
+            entries[key] = {
+                "timestamp": timestamp,
+                "partition": partition,
+                "offset": len(body),
+                "length": len(line),
+            }
+            body += line + b"\n"
+
+        utils.s3.Object(utils.bucket_name, partition).put(
+            Body=body, ContentType="application/x-ndjson"
+        )
+
+    utils.save_data_s3(index, path)
+    utils.indexes.pop((dset_prefix, day), None)
+
+    keys = [key for type_files in files.values() for key, _ in type_files]
+    bucket = utils.s3.Bucket(utils.bucket_name)
+    for i in range(0, len(keys), 1000):
+        objects = [{"Key": key} for key in keys[i : i + 1000]]
+        bucket.delete_objects(Delete={"Objects": objects})
+    return len(keys)
+
+
+def compact(dset_prefix: str, until: str = None) -> dict:
+    """Compact hourly files of all days before the given date.
+
+    Args:
+        dset_prefix (str): A prefix of the path to the data set.
+        until (str, optional): The first day that is not compacted
+            (ISO format). (Default is today)
+
+    Returns:
+        The number of compacted files by day.
+    """
+    if until:
+        until = datetime.date.fromisoformat(until)
+    else:
+        until = datetime.date.today()
+    until = until.strftime("%Y/%m/%d")
+
+    compacted = {}
+    for day, files in sorted(hourly_files(dset_prefix).items()):
+        if day < until:
+            compacted[day] = compact_day(dset_prefix, day, files)
+    return compacted
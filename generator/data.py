@@ -137,16 +137,15 @@ class MarkovChain:
         return states
 
 
-def generate_flow(params: Namespace, user_id: str, items_ids: list) -> list:
-    """Generate a list of actions in one flow for a specific user.
+def start_flow(params: Namespace, user_id: str) -> dict:
+    """Start a new flow of actions for a specific user.
 
     Args:
         params (Namespace): Input parameters for operations.
         user_id (str): Id of a user.
-        items_ids (list): Ids of all possible items.
 
     Returns:
-        The list of actions for the flow.
+        The state of the flow. It contains only JSON serializable values.
     """
     mc = MarkovChain(
         params.action_types, params.initial_state, params.final_state
@@ -159,79 +158,121 @@ def generate_flow(params: Namespace, user_id: str, items_ids: list) -> list:
         start_date=start_date, end_date=end_date
     )
 
-    was_logged_in = True
-    found_item_id = None
-    cart = []
-    session_id = fake.uuid4()
+    flow = {
+        "user_id": user_id,
+        "session_id": fake.uuid4(),
+        "action_types": action_types,
+        "step": 0,
+        "start_time": start_time.isoformat(),
+        "was_logged_in": True,
+        "found_item_id": None,
+        "cart": [],
+        "done": len(action_types) < 2,
+    }
+    return flow
 
-    actions = []
-    for current_type, next_type in zip(action_types, action_types[1:]):
-        end_time = start_time + timedelta(minutes=15)
-        t = fake.date_time_between(start_date=start_time, end_date=end_time)
-        event_time = t.strftime("%Y-%m-%d %H:%M:%S")
-        start_time = t + timedelta(minutes=1)
 
-        item_id = random.choice(items_ids)
-        id_to_remove = None
+def next_action(params: Namespace, flow: dict, items_ids: list) -> dict:
+    """Generate the next action in the flow and update the flow state.
 
-        if current_type == "log_in":
-            code = 200
-            was_logged_in = False
-        elif current_type == "open_store":
-            code = 100 if was_logged_in else 200
-            was_logged_in = True
-        elif current_type == "search_item":
-            if next_type in ("open_store", "view_cart"):
-                code = random.choice([200, 204, 404])
-            else:
-                found_item_id = item_id
-                code = 200
-        elif current_type == "add_to_cart":
-            cart.append(found_item_id)
+    Args:
+        params (Namespace): Input parameters for operations.
+        flow (dict): The state of the flow (see `start_flow`).
+        items_ids (list): Ids of all possible items.
+
+    Returns:
+        The action.
+    """
+    user_id = flow["user_id"]
+    cart = flow["cart"]
+    current_type = flow["action_types"][flow["step"]]
+    next_type = flow["action_types"][flow["step"] + 1]
+
+    start_time = datetime.fromisoformat(flow["start_time"])
+    end_time = start_time + timedelta(minutes=15)
+    t = fake.date_time_between(start_date=start_time, end_date=end_time)
+    event_time = t.strftime("%Y-%m-%d %H:%M:%S")
+    flow["start_time"] = (t + timedelta(minutes=1)).isoformat()
+
+    item_id = random.choice(items_ids)
+    id_to_remove = None
+
+    if current_type == "log_in":
+        code = 200
+        flow["was_logged_in"] = False
+    elif current_type == "open_store":
+        code = 100 if flow["was_logged_in"] else 200
+        flow["was_logged_in"] = True
+    elif current_type == "search_item":
+        if next_type in ("open_store", "view_cart"):
+            code = random.choice([200, 204, 404])
+        else:
+            flow["found_item_id"] = item_id
             code = 200
-        elif current_type == "view_cart":
-            code = 200 if cart else 204
-        elif current_type == "remove_from_cart":
-            id_to_remove = None
-            if cart:
-                id_to_remove = random.choice(cart)
-                cart.remove(id_to_remove)
-                code = 200
-            else:
-                code = 405
-        elif current_type == "pay":
-            if cart:
-                code = int(
-                    np.random.choice([200, 400, 402], p=[0.9, 0.05, 0.05])
-                )
-            else:
-                code = 405
-        elif current_type == "log_out":
+    elif current_type == "add_to_cart":
+        cart.append(flow["found_item_id"])
+        code = 200
+    elif current_type == "view_cart":
+        code = 200 if cart else 204
+    elif current_type == "remove_from_cart":
+        id_to_remove = None
+        if cart:
+            id_to_remove = random.choice(cart)
+            cart.remove(id_to_remove)
             code = 200
+        else:
+            code = 405
+    elif current_type == "pay":
+        if cart:
+            code = int(np.random.choice([200, 400, 402], p=[0.9, 0.05, 0.05]))
+        else:
+            code = 405
+    elif current_type == "log_out":
+        code = 200
+
+    args = {
+        "user_id": user_id,
+        "item_id": item_id,
+        "found_item_id": flow["found_item_id"],
+        "cart": cart,
+        "id_to_remove": id_to_remove,
+    }
+    action_results = params.action_results[current_type]
+    result = action_results[str(code)].format(**args)
+
+    action = {
+        "event_time": event_time,
+        "user_id": user_id,
+        "action_type": current_type,
+        "action_result": result,
+        "status_code": code,
+        "session_id": flow["session_id"],
+    }
+
+    flow["step"] += 1
+    if random.random() <= 0.005:
+        flow["done"] = True
+    if flow["step"] >= len(flow["action_types"]) - 1:
+        flow["done"] = True
+
+    return action
 
-        args = {
-            "user_id": user_id,
-            "item_id": item_id,
-            "found_item_id": found_item_id,
-            "cart": cart,
-            "id_to_remove": id_to_remove,
-        }
-        action_results = params.action_results[current_type]
-        result = action_results[str(code)].format(**args)
-
-        action = {
-            "event_time": event_time,
-            "user_id": user_id,
-            "action_type": current_type,
-            "action_result": result,
-            "status_code": code,
-            "session_id": session_id
-        }
-        actions.append(action)
 
-        if random.random() <= 0.005:
-            break
+def generate_flow(params: Namespace, user_id: str, items_ids: list) -> list:
+    """Generate a list of actions in one flow for a specific user.
+
+    Args:
+        params (Namespace): Input parameters for operations.
+        user_id (str): Id of a user.
+        items_ids (list): Ids of all possible items.
 
+    Returns:
+        The list of actions for the flow.
+    """
+    flow = start_flow(params, user_id)
+    actions = []
+    while not flow["done"]:
+        actions.append(next_action(params, flow, items_ids))
     return actions
 
 
@@ -255,3 +296,35 @@ def generate_user_actions(
         actions = generate_flow(params, user_id, items_ids)
         user_actions.extend(actions)
     return user_actions
+
+
+def generate_user_actions_chunk(
+    params: Namespace,
+    user_ids: list,
+    items_ids: list,
+    size: int = 1000,
+    flow: dict = None,
+) -> tuple:
+    """Generate a chunk of user actions that may end in the middle of a flow.
+
+    Args:
+        params (Namespace): Input parameters for operations.
+        user_ids (list): Ids of all possible users.
+        items_ids (list): Ids of all possible items.
+        size (int): The number of actions in the chunk. If 0, only the
+            in-flight flow is finished. (Default is 1000)
+        flow (dict, optional): The state of the in-flight flow to continue.
+
+    Returns:
+        The list of user actions and the state of the in-flight flow
+        (None if the last flow was finished).
+    """
+    user_actions = []
+    while len(user_actions) < size or (size == 0 and flow):
+        if flow is None:
+            flow = start_flow(params, random.choice(user_ids))
+        if not flow["done"]:
+            user_actions.append(next_action(params, flow, items_ids))
+        if flow["done"]:
+            flow = None
+    return user_actions, flow
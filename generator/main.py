@@ -2,19 +2,29 @@
 # CLI application
 
 from argparse import Namespace
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import typer
 
 from config import config
-from generator import update, utils
+from generator import backfill, compact, update, utils
 
 app = typer.Typer()
 
 
+def report_job(checkpoint: dict) -> None:
+    status = "finished" if checkpoint["done"] else "checkpointed"
+    typer.echo(
+        f"Job {checkpoint['job_id']} {status}: "
+        f"{checkpoint['n_records']}/{checkpoint['size']} records "
+        f"in {len(checkpoint['chunks'])} chunks."
+    )
+
+
 @app.command()
-def user_ids(size: int = 1000):
-    update.user_ids_dset(size)
+def user_ids(size: int = 1000, dt: str = None):
+    update.user_ids_dset(size, dt)
 
 
 @app.command()
@@ -22,15 +32,98 @@ def items(
     params_fp: Path = Path(config.CONFIG_DIR, "generator_params.json"),
     size: int = 1000,
     n_del: int = 5,
+    job_id: str = None,
+    chunk_size: int = 1000,
+    max_chunks: int = None,
+    dt: str = None,
 ):
     params = Namespace(**utils.load_data(filepath=params_fp))
-    update.items_dset(params, size, n_del)
+    if job_id:
+        checkpoint = update.items_job(
+            params, job_id, size, n_del, chunk_size, max_chunks, dt
+        )
+        report_job(checkpoint)
+    else:
+        update.items_dset(params, size, n_del, dt)
 
 
 @app.command()
 def user_actions(
     params_fp: Path = Path(config.CONFIG_DIR, "generator_params.json"),
     size: int = 1000,
+    job_id: str = None,
+    chunk_size: int = 1000,
+    max_chunks: int = None,
+    dt: str = None,
+    start_date: str = None,
+    end_date: str = None,
+):
+    params = Namespace(**utils.load_data(filepath=params_fp))
+    if dt and not (start_date and end_date):
+        end = datetime.fromisoformat(dt)
+        start_date = (end - timedelta(hours=1)).isoformat()
+        end_date = end.isoformat()
+    if start_date and end_date:
+        params.start_date = start_date
+        params.end_date = end_date
+    if job_id:
+        checkpoint = update.user_actions_job(
+            params, job_id, size, chunk_size, max_chunks, dt
+        )
+        report_job(checkpoint)
+    else:
+        update.user_actions_dset(params, size, dt)
+
+
+@app.command(name="backfill")
+def backfill_dsets(
+    start: str,
+    end: str,
+    cadence: int = 60,
+    params_fp: Path = Path(config.CONFIG_DIR, "generator_params.json"),
+    items_size: int = 1000,
+    user_actions_size: int = 10000,
+    user_ids_size: int = 0,
+    n_del: int = 5,
+    workers: int = None,
+    seed: int = None,
 ):
+    if cadence < 1:
+        raise typer.BadParameter(
+            "must be at least 1 minute.", param_hint="'--cadence'"
+        )
     params = Namespace(**utils.load_data(filepath=params_fp))
-    update.user_actions_dset(params, size)
+    sizes = {
+        "items": items_size,
+        "user_actions": user_actions_size,
+        "user_ids": user_ids_size,
+    }
+    tasks = backfill.schedule(
+        start,
+        end,
+        cadence,
+        items=items_size > 0,
+        user_actions=user_actions_size > 0,
+        user_ids=user_ids_size > 0,
+    )
+
+    def on_progress(task, stats):
+        typer.echo(
+            f"[{stats['n_tasks']}/{len(tasks)}] {task['id']} "
+            f"({stats['n_records'] / stats['elapsed']:.0f} records/s)"
+        )
+
+    stats = backfill.run(
+        tasks, params, sizes, cadence, n_del, seed, workers, on_progress
+    )
+    typer.echo(
+        f"Backfilled {stats['n_records']} records in {stats['n_tasks']} "
+        f"tasks in {stats['elapsed']:.1f} s."
+    )
+
+
+@app.command(name="compact")
+def compact_dsets(dset_prefix: str, until: str = None):
+    compacted = compact.compact(dset_prefix, until)
+    for day, n_files in compacted.items():
+        typer.echo(f"{dset_prefix}/{day}: {n_files} files compacted.")
@@ -6,9 +6,9 @@ from argparse import Namespace
 from generator import data, utils
 
 
-def user_ids_dset(size: int = 1000) -> None:
+def user_ids_dset(size: int = 1000, dt: str = None) -> None:
     user_ids = data.generate_user_ids(size)
-    path = utils.dt_path("user_ids") + ".json"
+    path = utils.dt_path("user_ids", dt) + ".json"
     utils.save_data_s3(user_ids, path)
 
 
@@ -50,18 +50,103 @@ def items_dset(
     delete_items(n_del, new_available, dt)
 
 
-def user_actions_dset(params: Namespace, size: int = 1000) -> None:
-    user_ids_path = utils.latest_path("user_ids") + ".json"
+def user_actions_dset(
+    params: Namespace,
+    size: int = 1000,
+    dt: str = None,
+    user_ids_path: str = None,
+    items_path: str = None,
+) -> int:
+    if not user_ids_path:
+        user_ids_path = utils.latest_path("user_ids", last_dt=dt) + ".json"
     user_ids = utils.load_data_s3(path=user_ids_path)
 
-    base_items_path = utils.latest_path(
-        dset_prefix="items", dset_type="_available"
-    )
-    items_path = base_items_path + "_available.json"
+    if not items_path:
+        base_items_path = utils.latest_path(
+            dset_prefix="items", dset_type="_available", last_dt=dt
+        )
+        items_path = base_items_path + "_available.json"
     items_ids = utils.load_data_s3(path=items_path)
 
     user_actions = data.generate_user_actions(
         params, user_ids, items_ids, size
     )
-    path = utils.dt_path("user_actions") + ".json"
+    path = utils.dt_path("user_actions", dt) + ".json"
     utils.save_data_s3(data=user_actions, path=path)
+    return len(user_actions)
+
+
+def items_job(
+    params: Namespace,
+    job_id: str,
+    size: int = 1000,
+    n_del: int = 5,
+    chunk_size: int = 1000,
+    max_chunks: int = None,
+    dt: str = None,
+) -> dict:
+    def generate_chunk(n, state):
+        return data.generate_items(params, n), state
+
+    def finalize(checkpoint):
+        new_available = []
+        for chunk in checkpoint["chunks"]:
+            items = utils.load_data_s3(chunk["path"])
+            new_available.extend(item["id"] for item in items)
+        delete_items(n_del, new_available, checkpoint["dt"])
+
+    return utils.run_job(
+        job_id,
+        "items",
+        generate_chunk,
+        size,
+        chunk_size,
+        dt=dt,
+        finalize=finalize,
+        max_chunks=max_chunks,
+    )
+
+
+def user_actions_job(
+    params: Namespace,
+    job_id: str,
+    size: int = 1000,
+    chunk_size: int = 1000,
+    max_chunks: int = None,
+    dt: str = None,
+) -> dict:
+    checkpoint = utils.load_checkpoint(job_id)
+    if checkpoint:
+        meta = checkpoint["meta"]
+    else:
+        base_items_path = utils.latest_path(
+            dset_prefix="items", dset_type="_available", last_dt=dt
+        )
+        meta = {
+            "user_ids_path": utils.latest_path("user_ids", last_dt=dt)
+            + ".json",
+            "items_path": base_items_path + "_available.json",
+            "start_date": params.start_date,
+            "end_date": params.end_date,
+        }
+    params.start_date = meta.get("start_date", params.start_date)
+    params.end_date = meta.get("end_date", params.end_date)
+    user_ids = utils.load_data_s3(path=meta["user_ids_path"])
+    items_ids = utils.load_data_s3(path=meta["items_path"])
+
+    def generate_chunk(n, state):
+        user_actions, flow = data.generate_user_actions_chunk(
+            params, user_ids, items_ids, n, state.get("flow")
+        )
+        return user_actions, {"flow": flow} if flow else {}
+
+    return utils.run_job(
+        job_id,
+        "user_actions",
+        generate_chunk,
+        size,
+        chunk_size,
+        dt=dt,
+        meta=meta,
+        max_chunks=max_chunks,
+    )
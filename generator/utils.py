@@ -7,12 +7,19 @@ import os
 import random
 import re
 from pathlib import Path
+from typing import Callable
 
 import boto3
+import numpy as np
+from botocore.exceptions import ClientError
+from faker.generator import random as faker_random
 
 s3 = boto3.resource("s3")
 bucket_name = os.environ["BUCKET"]
 
+# Indexes of compacted days loaded by this process: (prefix, day) -> (ETag, index)
+indexes = {}
+
 
 def load_data(filepath: str) -> dict:
     """Load a dictionary from a JSON's filepath.
@@ -54,6 +61,8 @@ def latest_path(
 ) -> str:
     """Get path of the latest dataset on S3.
 
+    Datasets merged by compaction are found through the indexes of days.
+
     Args:
         dset_prefix (str): A prefix of the path to the dataset.
         dset_type (str, optional): Data set file type. (e.g "_available", "_unavailable")
@@ -64,23 +73,35 @@ def latest_path(
     """
     bucket = s3.Bucket(bucket_name)
 
-    objects = bucket.objects.filter(Prefix=dset_prefix)
-    paths = [
-        obj.key for obj in objects if obj.key.endswith(f"{dset_type}.json")
-    ]
+    last_path = dt_path(dset_prefix, last_dt) if last_dt else None
+    last_day = last_path[len(dset_prefix) + 1 :][:10] if last_path else None
 
-    if not paths:
-        return None
+    objects = bucket.objects.filter(Prefix=dset_prefix)
+    days = {}
+    index_tags = {}
+    for obj in objects:
+        day = obj.key[len(dset_prefix) + 1 :][:10]
+        if last_day and day > last_day:
+            continue
+        days.setdefault(day, []).append(obj.key)
+        if obj.key == index_path(dset_prefix, day):
+            index_tags[day] = obj.e_tag
 
-    last_path = dt_path(dset_prefix, last_dt) if last_dt else None
     raw_path = None
-    if not last_path:
-        raw_path = paths[-1]
-    else:
-        for p in reversed(paths):
-            if p < last_path:
-                raw_path = p
-                break
+    for day in sorted(days, reverse=True):
+        keys = days[day]
+        if day in index_tags:
+            index = load_index(dset_prefix, day, index_tags[day])
+            keys = keys + list(index["entries"])
+        paths = [
+            key
+            for key in keys
+            if key.endswith(f"{dset_type}.json")
+            and (not last_path or key < last_path)
+        ]
+        if paths:
+            raw_path = max(paths)
+            break
 
     if not raw_path:
         return None
@@ -90,6 +111,49 @@ def latest_path(
     return path
 
 
+def index_path(dset_prefix: str, day: str) -> str:
+    """Create path for the index of the compacted day.
+
+    Args:
+        dset_prefix (str): A prefix of the path to the dataset.
+        day (str): The day. (e.g "2022/02/05")
+
+    Returns:
+        The path to the index.
+        prefix/year/month/day/yearmonthday.index
+    """
+    return str(Path(dset_prefix, day, day.replace("/", "") + ".index"))
+
+
+def load_index(
+    dset_prefix: str, day: str, e_tag: str = None, refresh: bool = False
+) -> dict:
+    """Load the index of the compacted day from S3.
+
+    Loaded indexes are cached for the process.
+
+    Args:
+        dset_prefix (str): A prefix of the path to the dataset.
+        day (str): The day. (e.g "2022/02/05")
+        e_tag (str, optional): The current ETag of the index (e.g. from a listing).
+            The cached index is loaded again if its ETag is different.
+        refresh (bool): Load the index again even if it is cached. (Default is False)
+
+    Returns:
+        The index. `entries` maps paths of the original files to their
+        timestamp, partition, offset and length (in bytes) in the partition.
+    """
+    cached = indexes.get((dset_prefix, day))
+    if cached and not refresh and (e_tag is None or cached[0] == e_tag):
+        return cached[1]
+
+    path = index_path(dset_prefix, day)
+    response = s3.Object(bucket_name, path).get()
+    index = json.loads(response["Body"].read().decode("utf-8"))
+    indexes[(dset_prefix, day)] = (response.get("ETag"), index)
+    return index
+
+
 def save_data_s3(data: list, path: str) -> None:
     """Save data to a bucket on S3.
 
@@ -114,11 +178,69 @@ def load_data_s3(path: str) -> list:
         A list with the data loaded.
     """
     obj = s3.Object(bucket_name, path)
-    file_content = obj.get()["Body"].read().decode("utf-8")
+    try:
+        file_content = obj.get()["Body"].read().decode("utf-8")
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "NoSuchKey":
+            raise
+        file_content = load_compacted_s3(path)
+        if file_content is None:
+            raise
     data = json.loads(file_content)
     return data
 
 
+def load_compacted_s3(path: str) -> str:
+    """Load the content of the original file from the compacted day on S3.
+
+    Args:
+        path (str): Path to the original file.
+
+    Returns:
+        The content of the file or None if it is not in the index.
+    """
+    r = re.match(r"([^/]+)/(\d{4}/\d{2}/\d{2})/", path)
+    if not r:
+        return None
+
+    day_key = r.groups()
+    cached = day_key in indexes
+    try:
+        entry = load_index(*day_key)["entries"].get(path)
+        if not entry and cached:
+            # The cached index may be older than the file's compaction.
+            entry = load_index(*day_key, refresh=True)["entries"].get(path)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "NoSuchKey":
+            raise
+        return None
+    if not entry:
+        return None
+
+    obj = s3.Object(bucket_name, entry["partition"])
+    end = entry["offset"] + entry["length"] - 1
+    body = obj.get(Range=f"bytes={entry['offset']}-{end}")["Body"]
+    return body.read().decode("utf-8")
+
+
+def exists_s3(path: str) -> bool:
+    """Check if the file exists in the bucket on S3.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        True if the file exists, False otherwise.
+    """
+    try:
+        s3.Object(bucket_name, path).load()
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            return False
+        raise
+    return True
+
+
 def to_delete(elements: list, n_del: int) -> set:
     """Return set with elements to delete.
 
@@ -136,3 +258,188 @@ def to_delete(elements: list, n_del: int) -> set:
         del_idxs = random.sample(range(len(elements)), n_del)
     to_del = {elem for idx, elem in enumerate(elements) if idx in del_idxs}
     return to_del
+
+
+def set_seed(seed: int) -> None:
+    """Seed all random number generators used for generation.
+
+    Args:
+        seed (int): The seed.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    faker_random.seed(seed)
+
+
+def get_rng_state() -> dict:
+    """Get the state of all random number generators used for generation.
+
+    Returns:
+        A JSON serializable dictionary with the states of `random`,
+        `numpy.random` and the generator shared by Faker instances.
+    """
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    state = {
+        "random": random.getstate(),
+        "faker": faker_random.getstate(),
+        "numpy": [name, keys.tolist(), pos, has_gauss, cached_gaussian],
+    }
+    return state
+
+
+def set_rng_state(state: dict) -> None:
+    """Restore the state of all random number generators.
+
+    Args:
+        state (dict): The state returned by `get_rng_state`.
+    """
+
+    def to_tuple(x):
+        return tuple(to_tuple(i) for i in x) if isinstance(x, list) else x
+
+    random.setstate(to_tuple(state["random"]))
+    faker_random.setstate(to_tuple(state["faker"]))
+    name, keys, *rest = state["numpy"]
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), *rest))
+
+
+def job_path(job_id: str, name: str) -> str:
+    """Create path for the file of the job.
+
+    Args:
+        job_id (str): Id of the job.
+        name (str): Name of the file. (e.g "checkpoint", "manifest")
+
+    Returns:
+        The path to the file.
+        jobs/job_id/name.json
+    """
+    return str(Path("jobs", job_id, name + ".json"))
+
+
+def load_checkpoint(job_id: str) -> dict:
+    """Load the latest checkpoint of the job from S3.
+
+    Args:
+        job_id (str): Id of the job.
+
+    Returns:
+        The checkpoint or None if the job was not started yet.
+    """
+    path = job_path(job_id, "checkpoint")
+    if not exists_s3(path):
+        return None
+    return load_data_s3(path)
+
+
+def run_job(
+    job_id: str,
+    dset_prefix: str,
+    generate_chunk: Callable,
+    size: int,
+    chunk_size: int = 1000,
+    dt: str = None,
+    meta: dict = None,
+    finalize: Callable = None,
+    max_chunks: int = None,
+    should_stop: Callable = None,
+) -> dict:
+    """Generate a data set in chunks, checkpointing progress to S3.
+
+    Each chunk is saved as a separate file next to the other files of the
+    data set. After each chunk the checkpoint with the saved chunks, the
+    state of random number generators and the state of the generator is
+    saved, so rerunning the job with the same id resumes it from the last
+    checkpoint. When the job is finished, its manifest is saved.
+
+    Args:
+        job_id (str): Id of the job.
+        dset_prefix (str): A prefix of the path to the data set.
+        generate_chunk (Callable): Function `(n, state) -> (records, state)`.
+            It generates `n` records continuing from `state`, a JSON
+            serializable dictionary of work in flight (empty if none).
+            Once `size` records are generated, it is called with `n=0`
+            until it returns an empty state.
+        size (int): The number of records in the data set.
+        chunk_size (int): The number of records in one chunk. (Default is 1000)
+        dt (str, optional): Date and time of the data set (ISO format).
+        meta (dict, optional): Data saved with the checkpoint of a new job
+            (e.g. paths to input data sets).
+        finalize (Callable, optional): Function called with the checkpoint
+            after all chunks are generated (e.g. to save derived data sets).
+        max_chunks (int, optional): The maximum number of chunks to
+            generate in this run.
+        should_stop (Callable, optional): Function checked after each chunk.
+            If it returns True, the run is stopped.
+
+    Returns:
+        The checkpoint of the job. `done` is True if the job is finished.
+
+    Raises:
+        ValueError: If `size` is negative or `chunk_size` is less than 1.
+    """
+    if size < 0:
+        raise ValueError("size must be non-negative.")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    checkpoint = load_checkpoint(job_id)
+    if checkpoint is None:
+        if not dt:
+            dt = datetime.datetime.now().isoformat(timespec="seconds")
+        checkpoint = {
+            "job_id": job_id,
+            "dset_prefix": dset_prefix,
+            "dt": dt,
+            "base_path": dt_path(dset_prefix, dt),
+            "size": size,
+            "chunk_size": chunk_size,
+            "n_records": 0,
+            "chunks": [],
+            "state": {},
+            "rng_state": None,
+            "meta": meta or {},
+            "done": False,
+        }
+    elif checkpoint["done"]:
+        return checkpoint
+    else:
+        set_rng_state(checkpoint["rng_state"])
+
+    n_chunks = 0
+    while checkpoint["n_records"] < checkpoint["size"] or checkpoint["state"]:
+        if max_chunks is not None and n_chunks >= max_chunks:
+            return checkpoint
+        if should_stop and should_stop():
+            return checkpoint
+
+        n = checkpoint["size"] - checkpoint["n_records"]
+        n = max(0, min(n, checkpoint["chunk_size"]))
+        records, state = generate_chunk(n, checkpoint["state"])
+
+        idx = len(checkpoint["chunks"])
+        path = f"{checkpoint['base_path']}_part{idx:05d}.json"
+        save_data_s3(records, path)
+
+        checkpoint["chunks"].append({"path": path, "size": len(records)})
+        checkpoint["n_records"] += len(records)
+        checkpoint["state"] = state or {}
+        checkpoint["rng_state"] = get_rng_state()
+        save_data_s3(checkpoint, job_path(job_id, "checkpoint"))
+        n_chunks += 1
+
+    if finalize:
+        finalize(checkpoint)
+
+    manifest = {
+        "job_id": job_id,
+        "dset_prefix": checkpoint["dset_prefix"],
+        "dt": checkpoint["dt"],
+        "n_records": checkpoint["n_records"],
+        "chunks": checkpoint["chunks"],
+        "meta": checkpoint["meta"],
+    }
+    save_data_s3(manifest, job_path(job_id, "manifest"))
+    checkpoint["done"] = True
+    save_data_s3(checkpoint, job_path(job_id, "checkpoint"))
+    return checkpoint